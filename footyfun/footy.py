@@ -2,6 +2,8 @@
 
 import cgi
 from datetime import datetime, timedelta, date
+import functools
+import hashlib
 import wsgiref.handlers
 import os
 import time
@@ -15,6 +17,7 @@ from google.appengine.ext import webapp
 from google.appengine.ext.db import djangoforms
 from google.appengine.api import datastore_errors
 from google.appengine.api import mail
+from google.appengine.api import memcache
 
 try:
     from django import newforms as forms
@@ -59,6 +62,7 @@ class Game(db.Model):
     bscore = db.IntegerProperty(default=-1)
     matchtime = db.DateTimeProperty()
     detail = db.StringProperty()
+    updated = db.DateTimeProperty(auto_now=True)
 
     def __str__(self):
 
@@ -66,6 +70,16 @@ class Game(db.Model):
             self.teama, self.teamb,
             self.competition.name, str(self.matchtime))
 
+    @property
+    def fixture_label(self):
+        """ Eg England v Germany """
+        return '%s v %s' % (self.teama, self.teamb)
+
+    @property
+    def scored_label(self):
+        """ Eg England 1 4 Germany """
+        return '%s %d %d %s' % (self.teama, self.ascore, self.bscore, self.teamb)
+
 class Competitor(db.Model):
     """ Keep track of who is entered in each league """
     punter = db.UserProperty(required=True)
@@ -316,15 +330,26 @@ class Statto(object):
         return Game.all().filter('matchtime >=', tday).filter('matchtime <=', tnextday)
         
 
-class MainPage(webapp.RequestHandler):
-    def get(self):
+def require_user(method):
+    """ Decorate a handler method so it is only run for logged in users.
 
+    Anyone else is sent off to log in. The method gets the user passed in.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
         user = users.get_current_user()
         if not user:
             self.redirect(users.create_login_url(self.request.uri))
-        else:
-            path = os.path.join(os.path.dirname(__file__), 'templates/game_list.html')
-            self.response.out.write(template.render(path, {}))
+            return
+        return method(self, user, *args, **kwargs)
+    return wrapper
+
+class MainPage(webapp.RequestHandler):
+    @require_user
+    def get(self, user):
+
+        path = os.path.join(os.path.dirname(__file__), 'templates/game_list.html')
+        self.response.out.write(template.render(path, {}))
 
 
 class NickNameField(forms.CharField):
@@ -350,18 +375,15 @@ class RegisterForm(forms.Form):
 
         
 class WelcomePage(webapp.RequestHandler):
-    def get(self):
+    @require_user
+    def get(self, user):
 
-        user = users.get_current_user()
-        if not user:
-            self.redirect(users.create_login_url(self.request.uri))
-        else:
-            leagues = Competitor.all().filter('punter =', user).filter('entered =', True)
-            leagues = [x.league for x in leagues if x.league.end >= date.today()]
-            admin = users.is_current_user_admin()
-            path = os.path.join(os.path.dirname(__file__), 'templates/welcome.html')
-            self.response.out.write(template.render(
-                    path, dict(leagues=leagues, register=RegisterForm(), admin=admin)))
+        leagues = Competitor.all().filter('punter =', user).filter('entered =', True)
+        leagues = [x.league for x in leagues if x.league.end >= date.today()]
+        admin = users.is_current_user_admin()
+        path = os.path.join(os.path.dirname(__file__), 'templates/welcome.html')
+        self.response.out.write(template.render(
+                path, dict(leagues=leagues, register=RegisterForm(), admin=admin)))
 
     def post(self):
 
@@ -390,7 +412,10 @@ class WelcomePage(webapp.RequestHandler):
                     return
                 
                 
-                competitor = Competitor(punter=user)
+                # keyed by user under the league, so get_competitor can
+                # fetch it directly
+                competitor = Competitor(parent=league, key_name=user.user_id(),
+                                        punter=user)
                 competitor.nickname = nickname
                 competitor.entered = True
                 competitor.league = league
@@ -410,74 +435,68 @@ class CommentForm(djangoforms.ModelForm):
 
 class LeaguePage(webapp.RequestHandler):
 
-    def get(self):
+    @require_user
+    def get(self, user):
 
-        user = users.get_current_user()
-        if not user:
-            self.redirect(users.create_login_url(self.request.uri))
-        else:
-            league_id = int(self.request.get('league'))
-            league = League.get_by_id(league_id)
+        league_id = int(self.request.get('league'))
+        league = get_league(league_id)
 
-            # Check user is entered
-            competitor = get_competitor(league, user)
-            if not competitor:
-                self.response.out.write('You are not a member of this league')
-                return
+        # Check user is entered
+        competitor = get_competitor(league, user)
+        if not competitor:
+            self.response.out.write('You are not a member of this league')
+            return
            
-            games = league.competition.game_set.order('matchtime')
+        games = league.competition.game_set.order('matchtime')
 
-            preds = get_prediction_lookup(competitor, league)
+        preds = get_prediction_lookup(competitor, league)
 
-            ngames = []
-            for game in games:
-                pred = preds.get(game.key())
+        ngames = []
+        for game in games:
+            pred = preds.get(game.key())
                     
-                if pred is not None and pred.ascore >= 0:
-                    game.preda = pred.ascore
-                    game.predb = pred.bscore
+            if pred is not None and pred.ascore >= 0:
+                game.preda = pred.ascore
+                game.predb = pred.bscore
 
-                ngames.append(game)
+            ngames.append(game)
             
-            comments = league.comment_set.order('date')
+        comments = league.comment_set.order('date')
 
-            comment_form = CommentForm()
+        comment_form = CommentForm()
 
-            path = get_template(league, 'game_list.html')
-            self.response.out.write(template.render(path, dict(games=ngames,
-                                                               npreds=len(preds),
-                                                               competition=league.competition,
-                                                               comment_form = comment_form,
-                                                               comments=comments,
-                                                               league=league)))
+        path = get_template(league, 'game_list.html')
+        self.response.out.write(template.render(path, dict(games=ngames,
+                                                           npreds=len(preds),
+                                                           competition=league.competition,
+                                                           comment_form = comment_form,
+                                                           comments=comments,
+                                                           league=league)))
 
 class PostCommentPage(webapp.RequestHandler):
 
-    def post(self):
+    @require_user
+    def post(self, user):
 
-        user = users.get_current_user()
-        if not user:
-            self.redirect(users.create_login_url(self.request.uri))
-        else:
-            form = CommentForm(self.request.POST)
-            if form.is_valid():
-                clean = form.clean()
+        form = CommentForm(self.request.POST)
+        if form.is_valid():
+            clean = form.clean()
                 
-                comment = Comment()
-                league_id = int(self.request.get('league'))
-                league = League.get_by_id(league_id)
+            comment = Comment()
+            league_id = int(self.request.get('league'))
+            league = League.get_by_id(league_id)
 
-                competitor = league.competitor_set.filter('punter =', user)
-                if not competitor:
-                    self.response.out.write('You are already entered in this league')
-                    return
+            competitor = league.competitor_set.filter('punter =', user)
+            if not competitor:
+                self.response.out.write('You are already entered in this league')
+                return
                 
-                comment.competitor = competitor[0]
-                comment.league = league
-                comment.content = clean['content']
-                comment.subject = clean['subject']
-                comment.date = datetime.now()
-                comment.put()
+            comment.competitor = competitor[0]
+            comment.league = league
+            comment.content = clean['content']
+            comment.subject = clean['subject']
+            comment.date = datetime.now()
+            comment.put()
         
         self.redirect('/leagueview/?league=%d' % league_id)
 
@@ -514,121 +533,200 @@ class PredictForm(djangoforms.ModelForm):
         model = Game
         exclude = ['competition']
 
+def get_competition(league):
+    """ Return the league's competition, from memcache if possible.
+
+    Competitions hardly ever change, so they are shared between requests
+    rather than fetched by every one.  The league is primed with it too,
+    so league.competition costs nothing for the rest of the request.
+    """
+    key = League.competition.get_value_for_datastore(league)
+    if key is None:
+        return None
+
+    cache_key = 'competition:%s' % key
+
+    competition = memcache.get(cache_key)
+    if competition is None:
+        competition = db.get(key)
+        if competition is not None:
+            memcache.set(cache_key, competition, time=3600)
+
+    league.competition = competition
+    return competition
+
+def get_league(league_id):
+    """ Return the league with league_id, or None, with its competition. """
+    league = League.get_by_id(league_id)
+    if league is not None:
+        get_competition(league)
+
+    return league
+
+def competitor_key(league_key, user):
+    """ Key of user's Competitor in a league.
+
+    Competitors are children of their league, named by user id.  Entries
+    from before that was the case aren't, see find_competitor.
+    """
+    return db.Key.from_path('Competitor', user.user_id(), parent=league_key)
+
+def find_competitor(league, user):
+    """ Query for user's Competitor in league, None if not entered. """
+    return Competitor.all().filter('league =', league).filter('punter =', user).get()
+
 def get_competitor(league, user):
     """ Retuern whether user is entered in the league """
-    competitors = league.competitor_set.filter('punter =', user)
-    if competitors.count() == 0:
-        return False
+    competitor = db.get(competitor_key(league.key(), user))
+    if competitor is None:
+        competitor = find_competitor(league, user)
 
-    return competitors[0]
+    return competitor or False
 
 def get_template(league, base):
     """ Return template for this league """
     
     lname = league.name.replace(' ', '_')
     cname = league.competition.name.replace(' ', '_')
-    paths = [
-        os.path.join(os.path.dirname(__file__), 'templates', cname, lname, base),
-        os.path.join(os.path.dirname(__file__), 'templates', cname, base),
-        os.path.join(os.path.dirname(__file__), 'templates', base),]
 
-    for path in paths:
-        if os.path.exists(path):
-            return path
+    return _resolve_template(cname, lname, base)
 
-    return base
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'templates')
 
-class PredictPage(webapp.RequestHandler):
+# Resolved template paths, keyed on (competition, league, template).
+# template.render already keeps the compiled templates, this saves us
+# hunting for the right file on every request.
+_TEMPLATE_PATHS = {}
 
-    def get(self):
+# Every file under TEMPLATE_DIR, relative to it.  Read on first use.
+_TEMPLATE_FILES = None
 
-        user = users.get_current_user()
-        if not user:
-            self.redirect(users.create_login_url(self.request.uri))
-        else:
+def _template_files():
+    """ Return the set of template files, walking TEMPLATE_DIR if need be.
 
-            league = League.get_by_id(int(self.request.get('league')))
+    Templates don't move while we are running so this is done once,
+    unless FOOTY_TEMPLATE_RELOAD is set in the environment for development.
+    """
+    global _TEMPLATE_FILES
+
+    if _TEMPLATE_FILES is None or os.environ.get('FOOTY_TEMPLATE_RELOAD'):
+        files = set()
+        for dirpath, dirnames, filenames in os.walk(TEMPLATE_DIR):
+            for filename in filenames:
+                files.add(os.path.relpath(
+                        os.path.join(dirpath, filename), TEMPLATE_DIR))
+        _TEMPLATE_FILES = files
+
+    return _TEMPLATE_FILES
+
+def _resolve_template(cname, lname, base):
+    """ Find the most specific template for a competition and league. """
+    key = (cname, lname, base)
+    path = _TEMPLATE_PATHS.get(key)
+    if path is not None:
+        return path
+
+    files = _template_files()
+    candidates = [
+        os.path.join(cname, lname, base),
+        os.path.join(cname, base),
+        base,]
+
+    path = base
+    for candidate in candidates:
+        if candidate in files:
+            path = os.path.join(TEMPLATE_DIR, candidate)
+            break
+
+    if not os.environ.get('FOOTY_TEMPLATE_RELOAD'):
+        _TEMPLATE_PATHS[key] = path
+
+    return path
 
-            if league is None:
-                self.response.out.write("You are not entered in this league")
-                return
+class PredictPage(webapp.RequestHandler):
 
-            # Check user is entered in the league
-            competitor = get_competitor(league, user)
-            if not competitor:
-                self.response.out.write("You are not entered in this league")
-                return
+    @require_user
+    def get(self, user):
+
+        league = get_league(int(self.request.get('league')))
+
+        if league is None:
+            self.response.out.write("You are not entered in this league")
+            return
+
+        # Check user is entered in the league
+        competitor = get_competitor(league, user)
+        if not competitor:
+            self.response.out.write("You are not entered in this league")
+            return
            
-            days = self.request.get('days')
-            games = league.competition.game_set.order('matchtime')
-            start = get_now()
-            games.filter('matchtime >', start)
-
-            if days:
-                end = start + timedelta(days=int(days))
-                games.filter('matchtime <=', end)
-
-            # Get user's predictions for this league
-            predictions = get_prediction_lookup(competitor, league)
-            fixgames = []
-            for game in games:
-                if game.key() in predictions:
-                    pred = predictions[game.key()]
-                    game.ascore = pred.ascore
-                    game.bscore = pred.bscore
-                else:
-                    game.ascore = game.bscore = 0
-                fixgames.append(game)
-
-            games = fixgames
-
-            path = get_template(league, 'predictions.html')
-            self.response.out.write(template.render(path, dict(
-                        games=games,
-                        league=league)))
+        days = self.request.get('days')
+        games = league.competition.game_set.order('matchtime')
+        start = get_now()
+        games.filter('matchtime >', start)
+
+        if days:
+            end = start + timedelta(days=int(days))
+            games.filter('matchtime <=', end)
+
+        # Get user's predictions for this league
+        predictions = get_prediction_lookup(competitor, league)
+        fixgames = []
+        for game in games:
+            if game.key() in predictions:
+                pred = predictions[game.key()]
+                game.ascore = pred.ascore
+                game.bscore = pred.bscore
+            else:
+                game.ascore = game.bscore = 0
+            fixgames.append(game)
 
+        games = fixgames
 
-    def post(self):
+        path = get_template(league, 'predictions.html')
+        self.response.out.write(template.render(path, dict(
+                    games=games,
+                    league=league)))
 
-        user = users.get_current_user()
-        if not user:
-            self.redirect(users.create_login_url(self.request.uri))
-        else:
-            #self.response.out.write(str(self.request.POST))
-            ascores = self.request.get('ascore', allow_multiple=True)
-            bscores = self.request.get('bscore', allow_multiple=True)
-            games = self.request.get('game', allow_multiple=True)
-            league = League.get(self.request.get('league'))
 
-            competitor = get_competitor(league, user)
-            if not competitor:
-                self.response.out.write("You are not entered in this league")
-                return
-            
-            current = get_prediction_lookup(competitor, league)
+    @require_user
+    def post(self, user):
+
+        #self.response.out.write(str(self.request.POST))
+        ascores = self.request.get('ascore', allow_multiple=True)
+        bscores = self.request.get('bscore', allow_multiple=True)
+        games = self.request.get('game', allow_multiple=True)
+        league = League.get(self.request.get('league'))
 
-            now = get_now()
+        competitor = get_competitor(league, user)
+        if not competitor:
+            self.response.out.write("You are not entered in this league")
+            return
             
-            for ascore, bscore, game in zip(ascores, bscores, games):
-                #self.response.out.write('%s %s x%sx\n' % (ascore, bscore, game))
-                game = Game.get(game)
-
-                if game.matchtime < now: continue
-
-                if game.key() in current:
-                    record = current[game.key()]
-                else:
-                    record = Prediction(competitor=competitor, punter=user)
-                    record.game = game
-                    record.league = league
+        current = get_prediction_lookup(competitor, league)
+
+        now = get_now()
+
+        for ascore, bscore, game in zip(ascores, bscores, games):
+            #self.response.out.write('%s %s x%sx\n' % (ascore, bscore, game))
+            game = Game.get(game)
+
+            if game.matchtime < now: continue
+
+            if game.key() in current:
+                record = current[game.key()]
+            else:
+                record = Prediction(competitor=competitor, punter=user)
+                record.game = game
+                record.league = league
                
 
-                record.ascore = int(ascore)
-                record.bscore = int(bscore)
+            record.ascore = int(ascore)
+            record.bscore = int(bscore)
 
-                record.put()
+            record.put()
 
-            self.redirect('/leagueview/?league=%d' % league.key().id())
+        self.redirect('/leagueview/?league=%d' % league.key().id())
         
 
 
@@ -637,7 +735,7 @@ class TablePage(webapp.RequestHandler):
 
     def get(self):
 
-        league = League.get_by_id(int(self.request.get('league')))
+        league = get_league(int(self.request.get('league')))
 
         path = get_template(league, 'table.html')
 
@@ -651,7 +749,7 @@ class FastTablePage(webapp.RequestHandler):
 
     def get(self):
 
-        league = League.get_by_id(int(self.request.get('league')))
+        league = get_league(int(self.request.get('league')))
         start = self.request.get('start')
         if start:
             start = parse_date(start)
@@ -688,7 +786,7 @@ class MotmPage(webapp.RequestHandler):
 
     def get(self):
 
-        league = League.get_by_id(int(self.request.get('league')))
+        league = get_league(int(self.request.get('league')))
         count = int(self.request.get('count', 2))
 
 
@@ -761,7 +859,7 @@ class WeeklyTablePage(webapp.RequestHandler):
         end = get_now()
         start = end - timedelta(days=7)
 
-        league = League.get_by_id(int(self.request.get('league')))
+        league = get_league(int(self.request.get('league')))
 
         results = create_table(league, start, end)
         path = get_template(league, 'table.html')
@@ -970,87 +1068,186 @@ class EggPoints(FootyPoints):
 
             self.result += 2 * quantum
     
+def points_class_for(competition):
+    """ Return the points class to use for the competition. """
+    if 'egg' in competition:
+        return EggPoints
+
+    return FootyPoints
+
 def Points(competition):
     """ Return an appropriate points object for the competition.
 
     Break my naming convention and make it look like a class.
     """
-    if 'egg' in competition:
-        return EggPoints()
+    return points_class_for(competition)()
+
+
+class GameScorer(object):
+    """ Score predictions against a single game.
+
+    The points class is picked once for the game rather than for every
+    prediction.
+    """
+    def __init__(self, competition, game, quantum=1.0):
+
+        self.points_class = points_class_for(competition)
+        self.game = game
+        self.quantum = quantum
+
+        # points for each (ascore, bscore) prediction seen so far
+        self.scored = {}
+
+    def score_prediction(self, prediction):
+        """ Return totalled points for one prediction.
+
+        Lots of people predict the same score, so predictions with the same
+        score share one Points object.  Don't change it.
+        """
+        key = (prediction.ascore, prediction.bscore)
+        points = self.scored.get(key)
+        if points is None:
+            points = self.points_class()
+            points.update(prediction, self.game, self.quantum)
+            points.set_total()
+            self.scored[key] = points
+
+        return points
+
+
+class GameRow(object):
+    """ One punter's line on the GamePage. """
+    __slots__ = ('points', 'game', 'preda', 'predb', 'punter', 'total', 'sort')
 
-    return FootyPoints()
+    def __init__(self, points, game, preda, predb, punter):
 
+        self.points = points
+        self.game = game
+        self.preda = preda
+        self.predb = predb
+        self.punter = punter
+        self.total = points.total
+        self.sort = (points.total, punter)
 
 class GamePage(webapp.RequestHandler):
     """ Page for a single game """
 
-    def get(self):
+    @require_user
+    def get(self, user):
         """ Return current prediction league table for a game. """
 
-        # User check
-        user = users.get_current_user()
-        if not user:
-            self.redirect(users.create_login_url(self.request.uri))
+        league_key = db.Key.from_path('League', int(self.request.get('league')))
+        game_key = db.Key.from_path('Game', int(self.request.get('game')))
+
+        # Finished games don't change, so may already be rendered
+        cache_key = game_html_key(league_key.id(), game_key.id())
+        cached = memcache.get(cache_key)
+        if cached is not None:
+            etag, html = cached
+            self.write_html(etag, html)
             return
 
-        league = League.get_by_id(int(self.request.get('league')))
+        # Get the league and the game we are interested in with one get
+        league, game = db.get([league_key, game_key])
 
         if league is None:
             # no such league, tell them they aren't entered.
             self.response.out.write("You are not entered in this league")
             return
 
-        # Check user is entered in the league
-        competitor = get_competitor(league, user)
-
-        # Get the game we are interested in
-        game = Game.get_by_id(int(self.request.get('game')))
+        get_competition(league)
 
-        # Get all predictions for the game
-        predictions = game.prediction_set.filter('league =', league)
-        
         now = get_now()
         if game.matchtime > now:
             path = get_template(league, 'comebacklater.html')
             self.response.out.write(template.render(path, dict(
                         league=league,
-                        fixture='%s v %s' % (game.teama, game.teamb))))
+                        fixture=game.fixture_label)))
+            return
+
+        # No need to go any further if they already have this page
+        etag = game_etag(league_key.id(), game)
+        if self.write_html(etag):
             return
 
+        # Get all predictions for the game, in one big batch rather than
+        # the default pages of 20
+        predictions = list(game.prediction_set.filter('league =', league).run(
+                batch_size=1000))
+
+        # and fetch all their competitors in one go
+        competitor_keys = [Prediction.competitor.get_value_for_datastore(prediction)
+                           for prediction in predictions]
+        competitors = dict(zip(competitor_keys, db.get(competitor_keys)))
+
         details = []
-        quantum = 1.0
+        scorer = GameScorer(league.competition.name, game)
         for prediction in predictions:
                                         
-            points = Points(league.competition.name)
-            points.update(prediction, game, quantum)
-            points.set_total()
-            nickname = prediction.competitor.nickname
-            details.append(dict(points=points,
-                                game=game,
-                                preda=prediction.ascore,
-                                predb=prediction.bscore,
-                                punter=nickname,
-                                total=points.total, 
-                                sort=(points.total, nickname),
-                                ))
+            points = scorer.score_prediction(prediction)
+            nickname = competitors[
+                Prediction.competitor.get_value_for_datastore(prediction)].nickname
+            details.append(GameRow(points, game, prediction.ascore,
+                                   prediction.bscore, nickname))
+
+        # best first, in the same order the template's sort key gives
+        details.sort(key=lambda row: row.sort, reverse=True)
 
         path = get_template(league, 'game.html')
-        self.response.out.write(template.render(path, dict(
+        html = template.render(path, dict(
                     league=league,
-                    fixture='%s %d %d %s' % (game.teama, game.ascore, game.bscore, game.teamb),
-                    details=details))) 
+                    game=game,
+                    fixture=game.scored_label,
+                    details=details))
+
+        # only keep it once the result is in.  Nothing clears it, so a
+        # corrected score shows up when it expires.
+        if game.ascore >= 0:
+            memcache.set(cache_key, (etag, html), time=300)
+
+        self.write_html(etag, html)
+
+    def write_html(self, etag, html=None):
+        """ Send html, or just a 304 if the browser's copy is current.
+
+        With no html only the 304 is tried.  Returns whether a response
+        was sent.
+        """
+        if etag is not None:
+            self.response.headers['ETag'] = etag
+            if etag == self.request.headers.get('If-None-Match'):
+                self.response.set_status(304)
+                return True
+
+        if html is None:
+            return False
+
+        self.response.out.write(html)
+        return True
+
+def game_html_key(league_id, game_id):
+    """ Memcache key for the rendered GamePage of a game in a league. """
+    return 'game_page:%d:%d' % (league_id, game_id)
+
+def game_etag(league_id, game):
+    """ ETag for a game's page in a league.
+
+    Predictions are locked once a game starts, so the page only changes
+    when the game does.  None if there is no result yet, or the game has
+    not been saved since it started recording when it was updated.
+    """
+    if game.ascore < 0 or game.updated is None:
+        return None
+
+    return '"%s"' % hashlib.md5('%d:%d:%s' % (
+            league_id, game.key().id(), game.updated.isoformat())).hexdigest()
 
 class TodayPage(webapp.RequestHandler):
 
-    def get(self):
+    @require_user
+    def get(self, user):
         """ Handle get requests. """
 
-        # User check
-        user = users.get_current_user()
-        if not user:
-            self.redirect(users.create_login_url(self.request.uri))
-            return
-
         games = todays_games()
         league = self.request.get('league')
 
@@ -1058,13 +1255,37 @@ class TodayPage(webapp.RequestHandler):
             template.render("templates/today.html",
                             dict(games=games, league=league)))
     
+def _today_midnight():
+    """ Return the start of today, as a datetime. """
+    return datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
+
 def todays_games():
+    """ Return a list of today's games.
+
+    Everybody sees the same list, so keep it in memcache for a minute.
+    """
+    today = _today_midnight()
+
+    key = 'todays_games:' + today.date().isoformat()
+    games = memcache.get(key)
+    if games is not None:
+        return games
 
-    today = date.today()
-    today = datetime.fromordinal(today.toordinal())
     tomorrow = today + timedelta(days=1)
 
-    return Game.all().filter('matchtime >=', today).filter('matchtime <=', tomorrow)
+    games = Game.all().filter('matchtime >=', today).filter('matchtime <=', tomorrow).fetch(500)
+
+    # fill in all their competitions with one get
+    keys = list(set([Game.competition.get_value_for_datastore(game)
+                     for game in games]))
+    competitions = dict(zip(keys, db.get(keys)))
+    for game in games:
+        game.competition = competitions[
+            Game.competition.get_value_for_datastore(game)]
+
+    memcache.set(key, games, time=60)
+
+    return games
 
         
 class DebugPage(webapp.RequestHandler):
@@ -1072,20 +1293,35 @@ class DebugPage(webapp.RequestHandler):
 
     def get(self):
         """ Get some stuff. """
-        today = date.today()
-        today = datetime.fromordinal(today.toordinal())
+        today = _today_midnight()
         yesterday = today - timedelta(days=1)
 
         #games = Game.all().filter('teama =', 'Germany').filter('teamb =', 'Spain').filter('matchtime >=', yesterday)
 
         games = [Game.get_by_id(84)]
         #self.response.out.write('Number of games %d' % games.count())
+
+        # build up the whole page and write it out once at the end
+        out = []
         for game in games:
-            for pred in game.prediction_set:
-                self.response.out.write('<p> %s %d %s %s %d %d %s' % (
-                        pred.key(), pred.key().id(), game.teama, game.teamb,
+            preds = list(game.prediction_set)
+
+            # fetch all the competitors in one go
+            keys = [Prediction.competitor.get_value_for_datastore(pred)
+                    for pred in preds]
+            comps = dict(zip(keys, db.get(keys)))
+
+            # the same for every line
+            teama, teamb = game.teama, game.teamb
+
+            for pred, comp_key in zip(preds, keys):
+                pred_key = pred.key()
+                out.append('<p> %s %d %s %s %d %d %s' % (
+                        pred_key, pred_key.id(), teama, teamb,
                         pred.ascore, pred.bscore,
-                        pred.competitor.nickname))
+                        comps[comp_key].nickname))
+
+        self.response.out.write(''.join(out))
                                     
             
 def parse_date(date=None, default=None):
@@ -1100,18 +1336,20 @@ def parse_date(date=None, default=None):
     
  
         
+# webapp compiles these once and tries them in order on each request.
+# None of them overlap, so keep the busiest pages at the front.
 application = webapp.WSGIApplication([
-  ('/', WelcomePage),
-  ('/league/.*', MainPage),
-  ('/leagueview/.*', LeaguePage),
-  ('/predictview/.*', PredictPage),
   ('/table/.*', FastTablePage),
-  ('/motm/.*', MotmPage),
-  ('/slowtable/.*', TablePage),
-  ('/weeklytable/.*', WeeklyTablePage),
+  ('/leagueview/.*', LeaguePage),
   ('/game/.*', GamePage),
+  ('/predictview/.*', PredictPage),
   ('/today/.*', TodayPage),
+  ('/', WelcomePage),
+  ('/weeklytable/.*', WeeklyTablePage),
+  ('/motm/.*', MotmPage),
   ('/post_comment/.*', PostCommentPage),
+  ('/slowtable/.*', TablePage),
+  ('/league/.*', MainPage),
   ('/debug/.*', DebugPage),
   
 ], debug=True)
@@ -1120,22 +1358,6 @@ application = webapp.WSGIApplication([
 def real_main():
     wsgiref.handlers.CGIHandler().run(application)
 
-def profile_main():
-    # This is the main function for profiling 
-    # We've renamed our original main() above to real_main()
-    import cProfile, pstats
-    prof = cProfile.Profile()
-    prof = prof.runctx("real_main()", globals(), locals())
-    print "<pre>"
-    stats = pstats.Stats(prof)
-    stats.sort_stats("cumulative")  # Or cumulative
-    stats.print_stats(80)  # 80 = how many to print
-    # The rest is optional.
-    # stats.print_callees()
-    # stats.print_callers()
-    print "</pre>"
- 
-main = profile_main
 main = real_main
     
 if __name__ == '__main__':
@@ -1,13 +1,21 @@
 #!/usr/bin/env python
 
-from django.db import models
+import collections
+import functools
+import os
+
+from django.db import models, transaction
 from django.contrib import admin
+from django.core.cache import cache
 from django.forms import ModelForm
 
 NAME_STRING = 100
 LONG_STRING = 1000
 URL_STRING = 1000
 
+# How long a computed league table may be served from the cache
+TABLE_CACHE_SECONDS = 30
+
 class Competition(models.Model):
     """ Identifier for a competition.
 
@@ -46,6 +54,12 @@ class Game(models.Model):
     matchtime = models.DateTimeField()
     detail = models.CharField(max_length=LONG_STRING)
 
+    class Meta:
+        # syncdb only adds this to new tables, existing databases need:
+        #   CREATE INDEX footyfun_game_competition_matchtime_ascore
+        #       ON footyfun_game (competition_id, matchtime, ascore);
+        index_together = [['competition', 'matchtime', 'ascore']]
+
     def __str__(self):
 
         return '%s v %s %s %s' % (
@@ -106,10 +120,19 @@ class PointInfo(models.Model):
 
     def __str__(self):
 
+        # Don't go to the database just to pretty print: use the nickname
+        # if the competitor came along with us, otherwise just its id.
+        cache_name = self._meta.get_field('competitor').get_cache_name()
+        competitor = getattr(self, cache_name, None)
+        if competitor is not None:
+            who = competitor.nickname
+        else:
+            who = str(self.competitor_id)
+
         return '%s %s %5.0f %5.0f %5.0f %5.0f %5.0f %s' % (
             str(self.date), str(self.totals),
             self.count, self.perfect, self.goals,
-            self.goal_difference, self.result, self.competitor.nickname)
+            self.goal_difference, self.result, who)
 
 
     def reset(self):
@@ -144,13 +167,58 @@ class PointInfo(models.Model):
         self.result = points.result
         self.count = points.count
 
-    def to_points(self):
+    def to_points(self, competition_name=None):
 
-        points = Points(self.league.competition.name)
+        if competition_name is None:
+            competition_name = self.league.competition.name
+        points = Points(competition_name)
         points.initialise(self)
         points.set_total()
         return points
 
+def _table_generation_key(league):
+
+    return 'table-generation:%d' % league.pk
+
+def table_cache_key(league, *args):
+    """ Cache key for one of a league's tables.
+
+    Includes the league's generation, so invalidate_tables() retires every
+    cached table for the league at once.
+    """
+    generation = cache.get(_table_generation_key(league), 0)
+    parts = [str(x).replace(' ', '_') for x in args]
+    return 'table:%d:%d:%s' % (league.pk, generation, ':'.join(parts))
+
+def invalidate_tables(league):
+    """ Forget any cached tables for league. """
+    key = _table_generation_key(league)
+    cache.add(key, 0, None)
+    cache.incr(key)
+
+def cache_table(fn):
+    """ Cache the tables built by fn(league, start, end) for a short while. """
+    @functools.wraps(fn)
+    def wrapper(league, start=None, end=None):
+        key = table_cache_key(league, fn.__name__, start, end)
+        results = cache.get(key)
+        if results is None:
+            results = fn(league, start, end)
+            cache.set(key, results, TABLE_CACHE_SECONDS)
+        return results
+    return wrapper
+
+def set_table_cache_headers(response):
+    """ Let browsers and proxies hang on to a table for a little while. """
+    response.headers['Cache-Control'] = (
+        'public, max-age=%d, stale-while-revalidate=%d' % (
+            TABLE_CACHE_SECONDS, 2 * TABLE_CACHE_SECONDS))
+    response.headers['Vary'] = 'Accept-Encoding'
+
+def _pi_qs():
+    """ PointInfo queryset that pulls in competitor and competition too. """
+    return PointInfo.objects.select_related('competitor', 'league__competition')
+
 class Statto(object):
 
     def __init__(self, league):
@@ -160,35 +228,35 @@ class Statto(object):
     def update_points(self, day, out=None):
         """ Update points totals for day. """
 
-        games = []
-        for game in self._days_games(day):
-            if game.ascore >= 0:
-                games.append(game)
+        games = list(self._days_games(day))
     
         league = self.league
         if out is not None:
             out.write('<br>xxx')
             out.write(str(len(games)))
 
-        competitors = dict([(x.nickname, x) for x in league.competitor_set])
+        competitors = dict([(x.nickname, x) for x in league.competitor_set.all()])
 
         # get points for the day
         points, junk = process_predictions(games, league, False, out=out)
 
         # retrieve current stuff
-        pointinfo = PointInfo.all().filter('date =', day).filter('league =', league).filter('totals =', False)
+        pointinfo = list(_pi_qs().filter(date=day, league=league, totals=False))
 
-        # convert to a dictionary
+        # convert to a dictionary, noting any duplicates for deletion
         current = {}
+        stale_ids = []
         for info in pointinfo:
             who = info.competitor.nickname
             if who in current:
-                info.delete()
+                stale_ids.append(info.id)
             else:
-                current[info.competitor.nickname] = info
+                current[who] = info
 
 
         # Now convert Points into PointInfo
+        to_create = []
+        to_update = []
         for who, point in points.iteritems():
             pinfo = current.get(who)
             if pinfo is None:
@@ -196,16 +264,26 @@ class Statto(object):
                 pinfo.league = league
                 pinfo.competitor = competitors[who]
                 pinfo.date = day
+                to_create.append(pinfo)
             else:
                 pinfo.reset()
+                to_update.append(pinfo)
             pinfo.add(point)
-            pinfo.save()
 
-        # finally delete any poininfo no longer needed
-        for pinfo in pointinfo:
-            who = pinfo.competitor.nickname
-            if who not in points:
-                pinfo.delete()
+        # finally work out any poininfo no longer needed
+        stale_ids.extend([info.id for who, info in current.iteritems()
+                          if who not in points])
+
+        # no bulk_update in this django, so write everything in a single
+        # transaction instead.
+        with transaction.atomic():
+            PointInfo.objects.bulk_create(to_create)
+            for pinfo in to_update:
+                pinfo.save(update_fields=[
+                    'perfect', 'goal_difference', 'goals', 'result', 'count'])
+            PointInfo.objects.filter(id__in=stale_ids).delete()
+
+        invalidate_tables(league)
 
     def cummulate(self, end=None):
         """ Create cumulative totals for each day up to end """
@@ -214,54 +292,61 @@ class Statto(object):
         if current >= end: return
 
         # get totals for current
-        pointinfo = PointInfo.all().filter('date =', current).filter('league =', self.league).filter('totals =', True)
+        pointinfo = _pi_qs().filter(date=current, league=self.league, totals=True)
         totals = {}
         for info in pointinfo:
             totals[info.competitor.nickname] = info
             
+        new_infos = []
         next = timedelta(days=1)
-        while current < end:
-            # move on to next
-            current += next
-
-            # get points for current
-            pointinfo = PointInfo.all().filter('date =', current).filter('league =', self.league).filter('totals =', False)
-
-            # turn points into a dictionary
-            pinfo = dict([(t.competitor.nickname, t) for t in pointinfo])
-
-            # remove existing totals
-            for info in PointInfo.all().filter('date =', current).filter('league =', self.league).filter('totals =', True):
-                info.delete()
-
-            # now need the set of nicks in totals and pointinfo
-            entered = set(totals.keys() + pinfo.keys())
-
-            for who in entered:
-                total = totals.get(who)
-                if total is None:
-                    total = PointInfo()
-                    total.league = self.league
-                    total.competitor = pinfo[who].competitor
-                    total.totals = True
-                    total.date = current
-                    totals[who] = total
-
-                points = pinfo.get(who)
-                if points is not None:
-                    total.add(points)
-
-            # save the records
-            for total in totals.itervalues():
-
-                info = PointInfo()
-                info.league = total.league
-                info.competitor = total.competitor
-                info.date = current
-                info.totals = True
-
-                info.initialise(total)
-                info.save()
+        # the old totals go as each day is worked out, so don't leave
+        # the range without any if we fail before they are replaced
+        with transaction.atomic():
+            while current < end:
+                # move on to next
+                current += next
+
+                # get points for current
+                pointinfo = _pi_qs().filter(date=current, league=self.league, totals=False)
+
+                # turn points into a dictionary
+                pinfo = dict([(t.competitor.nickname, t) for t in pointinfo])
+
+                # remove existing totals
+                PointInfo.objects.filter(
+                    date=current, league=self.league, totals=True).delete()
+
+                # now need the set of nicks in totals and pointinfo
+                entered = set(totals).union(pinfo)
+
+                for who in entered:
+                    total = totals.get(who)
+                    if total is None:
+                        total = PointInfo()
+                        total.league = self.league
+                        total.competitor = pinfo[who].competitor
+                        total.totals = True
+                        total.date = current
+                        totals[who] = total
+
+                    points = pinfo.get(who)
+                    if points is not None:
+                        total.add(points)
+
+                # save the records
+                for total in totals.itervalues():
+
+                    info = PointInfo()
+                    info.league = total.league
+                    info.competitor = total.competitor
+                    info.date = current
+                    info.totals = True
+
+                    info.initialise(total)
+                    new_infos.append(info)
+
+            # write the new totals in bulk rather than a row at a time
+            PointInfo.objects.bulk_create(new_infos, batch_size=500)
 
         # update date
         self.league.date = end
@@ -273,17 +358,22 @@ class Statto(object):
         if end is None:
             end = date.today()
 
+        key = table_cache_key(self.league, 'stats', start, end)
+        results = cache.get(key)
+        if results is not None:
+            return results
+
         self.cummulate(end)
 
         spoints = []
         if start is not None:
-            spoints = PointInfo.all().filter('date =', start).filter('league =', self.league).filter('totals =', True)
+            spoints = _pi_qs().filter(date=start, league=self.league, totals=True)
 
         startinfo = {}
         for sp in spoints:
             startinfo[sp.competitor.nickname] = sp
         
-        epoints = PointInfo.all().filter('date =', end).filter('league =', self.league).filter('totals =', True)
+        epoints = _pi_qs().filter(date=end, league=self.league, totals=True)
 
         results = []
         for endinfo in epoints:
@@ -292,14 +382,56 @@ class Statto(object):
                 endinfo.subtract(startinfo[who])
             results.append(endinfo)
 
+        cache.set(key, results, TABLE_CACHE_SECONDS)
+        return results
+
+    def snapshots(self, days):
+        """ Get cumulative totals for each of days in a single query.
+
+        Returns a dictionary of day -> nickname -> PointInfo.
+        """
+        results = dict((day, {}) for day in days)
+        if not results:
+            return results
+
+        self.cummulate(max(results))
+
+        pointinfo = _pi_qs().filter(date__in=results.keys(), league=self.league, totals=True)
+        for info in pointinfo:
+            results[info.date][info.competitor.nickname] = info
+
+        return results
+
+    def difference(self, startinfo, endinfo):
+        """ Get table stats between two snapshots.
+
+        Returns new PointInfo objects, leaving the snapshots untouched so
+        they can be shared between neighbouring periods.
+        """
+        results = []
+        for who, end in endinfo.iteritems():
+            info = PointInfo()
+            info.league = end.league
+            info.competitor = end.competitor
+            info.date = end.date
+            info.totals = True
+
+            info.initialise(end)
+            if who in startinfo:
+                info.subtract(startinfo[who])
+            results.append(info)
+
         return results
         
     def _days_games(self, day):
+        """ Games in this league's competition with a result on day. """
 
         tday = datetime.fromordinal(day.toordinal())
         tnextday = tday + timedelta(days=1)
         
-        return Game.all().filter('matchtime >=', tday).filter('matchtime <=', tnextday)
+        return Game.objects.filter(competition=self.league.competition_id,
+                                   matchtime__gte=tday, matchtime__lt=tnextday,
+                                   ascore__gte=0)
         
 
 class MainPage(webapp.RequestHandler):
@@ -363,15 +495,13 @@ class WelcomePage(webapp.RequestHandler):
                 league = League.get(clean['league_id'])
 
                 # Check not already entered
-                entered = set([x.punter.email() for x in league.competitor_set])
-                if user.email() in entered:
+                if league.competitor_set.filter(punter=user).exists():
                     self.response.out.write('You are already entered in this league')
                     return
 
                 # Check nickname not already taken
-                nicknames = set([x.nickname for x in league.competitor_set])
                 nickname = clean['nick_name']
-                if nickname in nicknames:
+                if league.competitor_set.filter(nickname=nickname).exists():
                     self.response.out.write('%s has already been taken as a nickname in this league')
                     return
                 
@@ -403,7 +533,8 @@ class LeaguePage(webapp.RequestHandler):
             self.redirect(users.create_login_url(self.request.uri))
         else:
             league_id = int(self.request.get('league'))
-            league = League.get_by_id(league_id)
+            league = League.objects.select_related('competition').filter(
+                pk=league_id).first()
 
             # Check user is entered
             competitor = get_competitor(league, user)
@@ -411,13 +542,13 @@ class LeaguePage(webapp.RequestHandler):
                 self.response.out.write('You are not a member of this league')
                 return
            
-            games = league.competition.game_set.order('matchtime')
+            games = league.competition.game_set.order_by('matchtime')
 
             preds = get_prediction_lookup(competitor, league)
 
             ngames = []
             for game in games:
-                pred = preds.get(game.key())
+                pred = preds.get(game.pk)
                     
                 if pred is not None and pred.ascore >= 0:
                     game.preda = pred.ascore
@@ -425,7 +556,7 @@ class LeaguePage(webapp.RequestHandler):
 
                 ngames.append(game)
             
-            comments = league.comment_set.order('date')
+            comments = league.comment_set.order_by('date')
 
             comment_form = CommentForm()
 
@@ -484,14 +615,12 @@ def get_now():
 def get_prediction_lookup(competitor, league):
     
     # Get any predictions for this competitor
-    predictions = Prediction.all()
-    predictions.filter('competitor =', competitor)
-    predictions.filter('league =', league)
+    predictions = Prediction.objects.filter(competitor=competitor, league=league)
 
     # Turn into lookup table
     lookup = {}
     for prediction in predictions:
-        lookup[prediction.game.key()] = prediction
+        lookup[prediction.game_id] = prediction
 
     return lookup
 
@@ -513,16 +642,38 @@ def get_template(league, base):
     
     lname = league.name.replace(' ', '_')
     cname = league.competition.name.replace(' ', '_')
+
+    return _resolve_template(cname, lname, base)
+
+# Resolved template paths, keyed on (competition, league, template).
+_TEMPLATE_PATHS = {}
+
+def _resolve_template(cname, lname, base):
+    """ Find the most specific template for a competition and league.
+
+    Templates don't move while we are running so the answer is remembered,
+    unless FOOTY_TEMPLATE_RELOAD is set in the environment for development.
+    """
+    key = (cname, lname, base)
+    path = _TEMPLATE_PATHS.get(key)
+    if path is not None:
+        return path
+
     paths = [
         os.path.join(os.path.dirname(__file__), 'templates', cname, lname, base),
         os.path.join(os.path.dirname(__file__), 'templates', cname, base),
         os.path.join(os.path.dirname(__file__), 'templates', base),]
 
-    for path in paths:
-        if os.path.exists(path):
-            return path
+    path = base
+    for candidate in paths:
+        if os.path.exists(candidate):
+            path = candidate
+            break
+
+    if not os.environ.get('FOOTY_TEMPLATE_RELOAD'):
+        _TEMPLATE_PATHS[key] = path
 
-    return base
+    return path
 
 class PredictPage(webapp.RequestHandler):
 
@@ -558,8 +709,8 @@ class PredictPage(webapp.RequestHandler):
             predictions = get_prediction_lookup(competitor, league)
             fixgames = []
             for game in games:
-                if game.key() in predictions:
-                    pred = predictions[game.key()]
+                if game.pk in predictions:
+                    pred = predictions[game.pk]
                     game.ascore = pred.ascore
                     game.bscore = pred.bscore
                 else:
@@ -581,9 +732,9 @@ class PredictPage(webapp.RequestHandler):
             self.redirect(users.create_login_url(self.request.uri))
         else:
             #self.response.out.write(str(self.request.POST))
-            ascores = self.request.get('ascore', allow_multiple=True)
-            bscores = self.request.get('bscore', allow_multiple=True)
-            games = self.request.get('game', allow_multiple=True)
+            ascores = [int(x) for x in self.request.get('ascore', allow_multiple=True)]
+            bscores = [int(x) for x in self.request.get('bscore', allow_multiple=True)]
+            games = [int(x) for x in self.request.get('game', allow_multiple=True)]
             league = League.get(self.request.get('league'))
 
             competitor = get_competitor(league, user)
@@ -594,25 +745,33 @@ class PredictPage(webapp.RequestHandler):
             current = get_prediction_lookup(competitor, league)
 
             now = get_now()
-            
-            for ascore, bscore, game in zip(ascores, bscores, games):
-                #self.response.out.write('%s %s x%sx\n' % (ascore, bscore, game))
-                game = Game.get(game)
 
-                if game.matchtime < now: continue
-
-                if game.key() in current:
-                    record = current[game.key()]
-                else:
-                    record = Prediction(competitor=competitor, punter=user)
-                    record.game = game
-                    record.league = league
-               
-
-                record.ascore = int(ascore)
-                record.bscore = int(bscore)
-
-                record.put()
+            # fetch all the games in one query, and drop any already started
+            game_map = Game.objects.in_bulk(games)
+            future = [(ascore, bscore, game_map[game])
+                      for ascore, bscore, game in zip(ascores, bscores, games)
+                      if game in game_map and game_map[game].matchtime >= now]
+
+            new_preds = []
+            updated_preds = []
+            for ascore, bscore, game in future:
+                record = current.get(game.pk)
+                if record is None:
+                    record = Prediction(competitor=competitor, punter=user,
+                                        game=game, league=league,
+                                        ascore=ascore, bscore=bscore)
+                    new_preds.append(record)
+                elif (record.ascore, record.bscore) != (ascore, bscore):
+                    record.ascore = ascore
+                    record.bscore = bscore
+                    updated_preds.append(record)
+
+            # no bulk_update in this django, so do the updates in a single
+            # transaction instead.
+            with transaction.atomic():
+                Prediction.objects.bulk_create(new_preds)
+                for record in updated_preds:
+                    record.save(update_fields=['ascore', 'bscore'])
 
             self.redirect('/leagueview/?league=%d' % league.key().id())
         
@@ -629,6 +788,7 @@ class TablePage(webapp.RequestHandler):
 
         results = create_table(league)
     
+        set_table_cache_headers(self.response)
         self.response.out.write(template.render(path, results))
 
 
@@ -650,10 +810,11 @@ class FastTablePage(webapp.RequestHandler):
 
         pinfo = statto.stats(start, end)
 
+        cname = league.competition.name
         scores = []
         for info in pinfo:
             punter = info.competitor.nickname
-            points = info.to_points()
+            points = info.to_points(cname)
 
             scores.append(dict(
                     total=points.total,
@@ -666,6 +827,7 @@ class FastTablePage(webapp.RequestHandler):
                        details=[],
                        league=league)
 
+        set_table_cache_headers(self.response)
         self.response.out.write(template.render(path, results))
 
 
@@ -706,14 +868,24 @@ class MotmPage(webapp.RequestHandler):
         statto = Statto(league)
         months = []
 
+        cname = league.competition.name
         oneoff = timedelta(days=-1)
+
+        # fetch the totals at every month boundary in one go
+        boundaries = set()
+        for start, end in dates[:count]:
+            boundaries.add(start+oneoff)
+            boundaries.add(end+oneoff)
+        snapshots = statto.snapshots(boundaries)
+
         for start, end in dates[:count]:
             
-            pinfo = statto.stats(start+oneoff, end+oneoff)
+            pinfo = statto.difference(snapshots[start+oneoff],
+                                      snapshots[end+oneoff])
             scores = []
             for info in pinfo:
                 punter = info.competitor.nickname
-                points = info.to_points()
+                points = info.to_points(cname)
 
                 if points.count > 0:
                     scores.append(dict(
@@ -744,16 +916,19 @@ class WeeklyTablePage(webapp.RequestHandler):
     """
     def get(self):
 
-        end = get_now()
+        # whole minutes, so repeat visits can share a cached table
+        end = get_now().replace(second=0, microsecond=0)
         start = end - timedelta(days=7)
 
         league = League.get_by_id(int(self.request.get('league')))
 
         results = create_table(league, start, end)
         path = get_template(league, 'table.html')
+        set_table_cache_headers(self.response)
         self.response.out.write(template.render(path, results))
 
 
+@cache_table
 def create_table(league, start=None, end=None):
     """ Do grunt work to create our league table. """
 
@@ -765,13 +940,13 @@ def create_table(league, start=None, end=None):
         end = get_now()
 
     
-    games = league.competition.game_set.filter('matchtime >=', start).filter('matchtime <=', end)
+    # only games with a result count, so leave the rest in the database
+    games = league.competition.game_set.filter(
+        matchtime__gte=start, matchtime__lte=end, ascore__gte=0)
     tymes.append(time.time())
-    
-    results = []
-    for game in games:
-        if game.ascore >= 0:
-            results.append(game)
+
+    # run the query here, so its time lands where the old filter pass was
+    results = list(games)
 
     tymes.append(time.time())
 
@@ -809,37 +984,56 @@ def process_predictions(results, league, do_details=True, out=None):
     quantum = 1.0
 
     cname = league.competition.name
+    PointsCls = points_class_for(cname)
+
+    # fetch all the predictions in one go, rather than one query per game
+    predictions = Prediction.objects.filter(
+        game__in=results, league=league).select_related('competitor')
+
+    by_game = collections.defaultdict(list)
+    for prediction in predictions:
+        by_game[prediction.game_id].append(prediction)
 
     for result in results:
 
-        predictions = result.prediction_set.filter('league =', league)
-    
-        for prediction in predictions:
+        for prediction in by_game[result.pk]:
             if out is not None:
                 out.write('<br>pred ')
                 out.write(str(prediction))
                 out.write('<br>')
                 
-            points = scores.setdefault(prediction.competitor.nickname, Points(cname))
-            points.update(prediction, result, quantum)
+            nickname = prediction.competitor.nickname
+            points = scores.get(nickname)
+            if points is None:
+                points = scores[nickname] = PointsCls()
+            worth = points.update(prediction, result, quantum)
 
             if not do_details:
                 continue
 
-            points = Points(cname)
-            points.update(prediction, result, quantum)
+            # reuse what update() scored rather than scoring it again
+            points = PointsCls()
+            (points.perfect, points.goal_difference,
+             points.goals, points.result) = worth
+            points.count = 1
             points.set_total()
             details.append(dict(points=points,
                                 game=result, game_id=result.key().id,
                                 preda=prediction.ascore,
                                 premodels=prediction.bscore,
-                                punter=prediction.competitor.nickname,
+                                punter=nickname,
                                 total=points.total,
                                 matchtime=result.matchtime))
 
     return scores, details
 
 class FootyPoints(object):
+
+    # One of these per punter per table (and more for details) so keep
+    # them small.
+    __slots__ = ('perfect', 'goal_difference', 'goals', 'result', 'count',
+                 'total', 'ppp')
+
     def __init__(self):
 
         self.perfect = 0
@@ -855,6 +1049,17 @@ class FootyPoints(object):
         self.goals = points.goals
         self.result = points.result
         self.count = points.count
+
+    def __getstate__(self):
+        # slots have no __dict__, so spell out what to pickle for the
+        # table cache
+        return dict((name, getattr(self, name))
+                    for name in FootyPoints.__slots__ if hasattr(self, name))
+
+    def __setstate__(self, state):
+
+        for name, value in state.iteritems():
+            setattr(self, name, value)
         
     def set_total(self):
         
@@ -875,28 +1080,49 @@ class FootyPoints(object):
                     total = self.total / count)
 
     def update(self, prediction, result, quantum=1.0):
+        """ Add in the points for a prediction.
+
+        Returns what this one prediction was worth, as
+        (perfect, goal_difference, goals, result).
+        """
+        scores = self.score(prediction, result, quantum)
+        perfect, goal_difference, goals, same_result = scores
 
         self.count += 1
+        self.perfect += perfect
+        self.goal_difference += goal_difference
+        self.goals += goals
+        self.result += same_result
+
+        return scores
+
+    @classmethod
+    def score(cls, prediction, result, quantum=1.0):
+        """ Points for a single prediction, without building a Points.
+
+        Returns (perfect, goal_difference, goals, result).
+        """
+        perfect = goal_difference = goals = same_result = 0
 
         pascore, pbscore = prediction.ascore, prediction.bscore
         ascore, bscore = result.ascore, result.bscore
 
         # Either teams goals right
         if pascore == ascore:
-            self.goals += quantum
+            goals += quantum
 
         if pbscore == bscore:
-            self.goals += quantum
+            goals += quantum
 
         # Goal difference
         if (pbscore - pascore ==
             bscore - ascore):
-            self.goal_difference += quantum
+            goal_difference += quantum
 
         # Perfect score
         if (pascore == ascore and 
             pbscore == bscore):
-            self.perfect += quantum
+            perfect += quantum
 
         # Same result
         if ((pascore > pbscore  and
@@ -908,41 +1134,46 @@ class FootyPoints(object):
             (pascore == pbscore  and
              ascore == bscore)):
 
-            self.result += 2 * quantum
+            same_result += 2 * quantum
+
+        return perfect, goal_difference, goals, same_result
 
 class EggPoints(FootyPoints):
     """ Points class for egg-chasing.
 
     Scores are higher so harder to predict so we need a different update method.
     """
+    __slots__ = ()
+
     tolerance = 3
     
-    def update(self, prediction, result, quantum=1.0):
+    @classmethod
+    def score(cls, prediction, result, quantum=1.0):
 
-        self.count += 1
-        tolerance = self.tolerance
-        tolerance1 = self.tolerance + 1
+        perfect = goal_difference = goals = same_result = 0
+        tolerance = cls.tolerance
+        tolerance1 = cls.tolerance + 1
         
         # Either teams points close
         delta = abs(prediction.ascore - result.ascore)
         if delta <= tolerance:
-            self.goals += quantum * (tolerance1 - delta)
+            goals += quantum * (tolerance1 - delta)
 
         delta = abs(prediction.bscore - result.bscore)
         if delta <= tolerance:
-            self.goals += quantum * (tolerance1 - delta)
+            goals += quantum * (tolerance1 - delta)
 
         # Point difference close
         delta = abs((prediction.bscore - prediction.ascore) -
                    (result.bscore - result.ascore))
         if delta <= tolerance:
-            self.goal_difference += quantum * (tolerance1 - delta)
+            goal_difference += quantum * (tolerance1 - delta)
 
         # Both points close
         delta = (abs(prediction.ascore - result.ascore) +
                  abs(prediction.bscore - result.bscore))
         if delta <= tolerance:
-            self.perfect += quantum  * (tolerance1 - delta)
+            perfect += quantum  * (tolerance1 - delta)
 
         # Same result
         if ((prediction.ascore > prediction.bscore  and
@@ -954,17 +1185,31 @@ class EggPoints(FootyPoints):
             (prediction.ascore == prediction.bscore  and
              result.ascore == result.bscore)):
 
-            self.result += 2 * quantum
+            same_result += 2 * quantum
+
+        return perfect, goal_difference, goals, same_result
     
+# Points class for each competition name seen so far.
+_POINTS_CLASS_CACHE = {}
+
+def points_class_for(competition):
+    """ Return the points class to use for the competition. """
+    cls = _POINTS_CLASS_CACHE.get(competition)
+    if cls is None:
+        if 'egg' in competition:
+            cls = EggPoints
+        else:
+            cls = FootyPoints
+        _POINTS_CLASS_CACHE[competition] = cls
+
+    return cls
+
 def Points(competition):
     """ Return an appropriate points object for the competition.
 
     Break my naming convention and make it look like a class.
     """
-    if 'egg' in competition:
-        return EggPoints()
-
-    return FootyPoints()
+    return points_class_for(competition)()
 
 
 class GamePage(webapp.RequestHandler):